@@ -3,22 +3,44 @@
 import argparse
 import csv
 import os
+import re
 from pathlib import Path
 
 try:
-    import fiona
+    import geopandas as gpd
+    import pyogrio
 except Exception as exc:
     raise SystemExit(
-        "Fiona is required to run this script. Install it with 'pip install fiona' or 'conda install -c conda-forge fiona'.\n"
+        "pyogrio is required to run this script. Install it with 'pip install pyogrio geopandas' or 'conda install -c conda-forge pyogrio geopandas'.\n"
         f"Import error: {exc}"
     )
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except Exception as exc:
+    raise SystemExit(
+        "pyarrow is required to run this script. Install it with 'pip install pyarrow' or 'conda install -c conda-forge pyarrow'.\n"
+        f"Import error: {exc}"
+    )
+
+
+_NON_DIGIT_RE = re.compile(r"\D")
+
 
 def norm_sa1(x: str) -> str:
-    s = "".join(ch for ch in str(x) if ch.isdigit())
-    if len(s) < 11:
-        s = s.zfill(11)
-    return s
+    return _NON_DIGIT_RE.sub("", str(x)).zfill(11)
+
+
+def norm_codes(values, *, width: int = 0):
+    """Vectorised norm_sa1 over an Arrow string array.
+
+    Strips non-digits and left-pads with zeros to ``width`` in Arrow's native
+    string kernels (norm_sa1 corresponds to width=11).
+    """
+    digits = pc.replace_substring_regex(pc.fill_null(values, ""), pattern=r"\D", replacement="")
+    return pc.utf8_lpad(digits, width=width, padding="0") if width else digits
 
 
 DATASETS = {
@@ -63,16 +85,49 @@ def detect_sa1_field(row: dict) -> str | None:
     return None
 
 
+# The WHERE pushdown is one layer scan testing an OGR IN list linearly per record; it only
+# beats reading the key column of every feature for ID sets small relative to the layer
+MAX_WHERE_IDS = 200
+MAX_WHERE_FRACTION = 0.05
+
+
+def read_csv_table(csv_path: Path) -> pa.Table:
+    """Parse a CSV with Arrow's multithreaded C reader, keeping every column as text.
+
+    Values stay strings (as with csv.DictReader) so codes keep leading zeros and
+    attributes are written out exactly as they appear in the CSV.
+    """
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+    convert = pacsv.ConvertOptions(column_types={name: pa.string() for name in header})
+    return pacsv.read_csv(str(csv_path), convert_options=convert)
+
+
 def load_target_features(shp_path: Path, target_ids: set[str]):
-    """Read shapefile once and cache geometry for target SA1s only."""
+    """Read shapefile once and cache geometry for target SA1s only.
+
+    Only the SA1_CODE21 column is read. Small ID sets are pushed down to GDAL as a
+    WHERE clause, so only the matching records are decoded; larger sets (or a filter
+    the driver rejects) read every feature and filter here.
+    """
+    info = pyogrio.read_info(str(shp_path))
+    max_where = MAX_WHERE_IDS if info["features"] < 0 else min(MAX_WHERE_IDS, info["features"] * MAX_WHERE_FRACTION)
+    gdf = None
+    if len(target_ids) <= max_where:
+        where = '"SA1_CODE21" IN (' + ",".join("'" + i.replace("'", "''") + "'" for i in sorted(target_ids)) + ")"
+        try:
+            gdf = pyogrio.read_dataframe(str(shp_path), columns=["SA1_CODE21"], where=where)
+        except ValueError:
+            print(f"WHERE filter rejected for {shp_path.name}; reading all features instead")
+    if gdf is None:
+        gdf = pyogrio.read_dataframe(str(shp_path), columns=["SA1_CODE21"])
+
     cached = {}
-    with fiona.open(str(shp_path)) as src:
-        crs = src.crs
-        for feat in src:
-            sa1_val = norm_sa1(feat["properties"].get("SA1_CODE21", ""))
-            if sa1_val in target_ids:
-                cached[sa1_val] = feat["geometry"]
-    return crs, cached
+    for prop_val, geom in zip(gdf["SA1_CODE21"], gdf.geometry):
+        sa1_val = norm_sa1(prop_val if prop_val is not None else "")
+        if sa1_val in target_ids:
+            cached[sa1_val] = geom
+    return gdf.crs, cached
 
 
 def main():
@@ -133,6 +188,9 @@ def main():
     crs, target_geoms = load_target_features(shp_path, target_ids)
     if not target_geoms:
         raise ValueError("No target SA1 geometries found in shapefile for the provided IDs.")
+    # Features written for every dataset: the matched target SA1s with a non-empty geometry
+    codes = [sa1 for sa1, geom in target_geoms.items() if geom is not None and not geom.is_empty]
+    geoms = [target_geoms[sa1] for sa1 in codes]
 
     out_files = []
     for d in to_run:
@@ -141,41 +199,31 @@ def main():
         out_path.parent.mkdir(parents=True, exist_ok=True)
 
         # Load CSV for this dataset
-        with open(csv_path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-        if not rows:
+        table = read_csv_table(csv_path)
+        if table.num_rows == 0:
             raise ValueError(f"No rows read from CSV: {csv_path}")
 
-        # Detect SA1 field and build lookup
-        sa1_field = detect_sa1_field(rows[0])
+        # Detect SA1 field (from the first row, as before) and build lookup of
+        # SA1 -> row values (in prop_keys order)
+        sa1_field = detect_sa1_field(table.slice(0, 1).to_pylist()[0])
         if not sa1_field:
             raise KeyError(
                 f"Could not detect SA1 column in {csv_path}. Expected one of 'SA1 (UR)', 'SA1_CODE21', etc."
             )
-        for r in rows:
-            r["SA1_CODE21"] = norm_sa1(r.get(sa1_field, ""))
-        by_sa1 = {r["SA1_CODE21"]: {k: r[k] for k in r if k != "SA1_CODE21"} for r in rows}
-
-        # Build schema (allow mixed Polygon/MultiPolygon)
-        prop_keys = [k for k in rows[0].keys() if k != "SA1_CODE21"]
-        out_schema = {"geometry": "Unknown", "properties": {"SA1_CODE": "str"}}
-        for k in prop_keys:
-            out_schema["properties"][k] = "str"
-
-        # Write GeoJSON using cached geometries
-        with fiona.open(str(out_path), "w", driver="GeoJSON", crs=crs, schema=out_schema) as dst:
-            for sa1 in target_ids:
-                geom = target_geoms.get(sa1)
-                if not geom:
-                    continue
-                attrs = by_sa1.get(sa1, {})
-                props = {k: "" for k in out_schema["properties"].keys()}
-                props["SA1_CODE"] = sa1
-                for k in prop_keys:
-                    if k in attrs:
-                        props[k] = str(attrs[k])
-                dst.write({"type": "Feature", "geometry": geom, "properties": props})
+        sa1_codes = norm_codes(table.column(sa1_field), width=11)
+        # Only target SA1s are written out; drop all other rows before pulling values into Python
+        keep = pc.is_in(sa1_codes, value_set=pa.array(sorted(target_ids), pa.string()))
+        table, sa1_codes = table.filter(keep), sa1_codes.filter(keep)
+        prop_keys = [k for k in table.column_names if k != "SA1_CODE21"]
+        by_sa1 = dict(zip(sa1_codes.to_pylist(), zip(*(table.column(k).to_pylist() for k in prop_keys))))
+
+        # Assemble the output layer column-wise from cached geometries and write it in one call
+        empty = ("",) * len(prop_keys)
+        rows = [by_sa1.get(sa1, empty) for sa1 in codes]
+        columns = {"SA1_CODE": codes}
+        columns.update((k, [r[i] for r in rows]) for i, k in enumerate(prop_keys))
+        gdf = gpd.GeoDataFrame(columns, geometry=geoms, crs=crs)
+        pyogrio.write_dataframe(gdf, str(out_path), driver="GeoJSON")
 
         print(f"GeoJSON exported: {out_path}")
         out_files.append(out_path)
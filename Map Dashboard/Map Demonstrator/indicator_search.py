@@ -1,7 +1,16 @@
 import json
 import re
+import numpy as np
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+try:
+    import json5  # parses JS/ES5 object literals directly (pip install json5)
+except ImportError:
+    json5 = None
+
+# Patterns used by load_and_parse_js_object, compiled once at import
+_OBJECT_RE = re.compile(r'=\s*(\{.*?\});', re.DOTALL)
+_SINGLE_QUOTED_RE = re.compile(r"'([^']*)'")
+_BARE_KEY_RE = re.compile(r'(\s*?{\s*?|\s*?,\s*?)([^"\s]+?)\s*?:')
 
 def load_and_parse_js_object(filepath):
     """
@@ -13,12 +22,16 @@ def load_and_parse_js_object(filepath):
 
         # Use regex to find the object literal within the file
         # This looks for content between the first '{' and the last '};'
-        match = re.search(r'=\s*(\{.*?\});', js_content, re.DOTALL)
+        match = _OBJECT_RE.search(js_content)
         if not match:
             raise ValueError("Could not find a JavaScript object literal in the file.")
         
         object_str = match.group(1)
-        
+        if json5 is not None:
+            # A real ES5 parser handles single quotes, bare keys and apostrophes in values
+            return json5.loads(object_str)
+
+        # Without json5, fall back to rewriting the literal as JSON.
         # The JS object uses single quotes, which is not valid JSON.
         # We need to be careful with replacements. A simple replace might break strings
         # containing apostrophes. A safer way is to use a more robust parser if the
@@ -26,9 +39,9 @@ def load_and_parse_js_object(filepath):
         
         # Step 1: Replace single quotes used for keys and values with double quotes
         # This regex specifically targets keys and string values
-        json_str = re.sub(r"'([^']*)'", r'"\1"', object_str)
+        json_str = _SINGLE_QUOTED_RE.sub(r'"\1"', object_str)
         # Step 2: Ensure keys that might not have been quoted are quoted
-        json_str = re.sub(r'(\s*?{\s*?|\s*?,\s*?)([^"\s]+?)\s*?:', r'\1"\2":', json_str)
+        json_str = _BARE_KEY_RE.sub(r'\1"\2":', json_str)
 
 
         # Parse the cleaned string as JSON
@@ -61,12 +74,13 @@ def create_documents_from_metadata(metadata):
 def find_most_relevant_indicator(query, model, indicator_names, document_embeddings):
     """
     Finds the most relevant indicator for a user query using cosine similarity.
+    Expects L2-normalised float32 document embeddings (see the indexing step).
     """
-    # 1. Encode the user's query into a vector
-    query_embedding = model.encode([query])
+    # 1. Encode the user's query into a unit-length vector
+    query_embedding = model.encode([query], normalize_embeddings=True, convert_to_numpy=True)[0].astype(np.float32)
     
-    # 2. Calculate cosine similarity between the query and all indicator documents
-    similarities = cosine_similarity(query_embedding, document_embeddings)[0]
+    # 2. Cosine similarity of unit vectors is a dot product: (N, 384) @ (384,) -> (N,)
+    similarities = document_embeddings @ query_embedding
     
     # 3. Find the index of the highest similarity score
     most_relevant_index = similarities.argmax()
@@ -93,7 +107,7 @@ if __name__ == "__main__":
         
         # 3. Create embeddings for all the indicator documents (This is the 'indexing' step)
         print("Creating embeddings for the knowledge base...")
-        document_embeddings = model.encode(documents)
+        document_embeddings = model.encode(documents, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
         
         # 4. Get user input
         print("-" * 30)
@@ -1,15 +1,15 @@
+import hashlib
 import json
-import re
 import os
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-from shapely.geometry import shape, mapping
+import pandas as pd
+import geopandas as gpd
+from shapely.errors import GEOSException
 from shapely.ops import unary_union
-from shapely.prepared import prep
-from pyproj import Transformer, CRS
+import pyogrio
 
 # --- Initialize Flask App and CORS ---
 app = Flask(__name__)
@@ -39,21 +39,60 @@ def create_documents_from_metadata(metadata):
     return indicator_names, documents
 
 # --- MODIFIED function to return a ranked list ---
-def find_ranked_indicators(query, model, indicator_names, document_embeddings):
+def find_ranked_indicators(query, model, indicator_names, document_embeddings, top_k=None):
     """
     Finds and ranks all indicators based on relevance to a user query.
+    Document embeddings are L2-normalised at load time, so cosine similarity
+    reduces to a dot product with the normalised query.
+    If top_k is given, only the top_k best matches are returned.
     """
-    query_embedding = model.encode([query])
-    similarities = cosine_similarity(query_embedding, document_embeddings)[0]
-
-    # Combine indicators with their scores
-    results = []
-    for i, name in enumerate(indicator_names):
-        results.append({"indicator": name, "score": float(similarities[i])})
+    query_embedding = model.encode([query], normalize_embeddings=True, convert_to_numpy=True)[0].astype(np.float32)
+    similarities = document_embeddings @ query_embedding
+
+    # Sort by score in descending order, then build result dicts in ranked order
+    if top_k is not None and 0 < top_k < len(similarities):
+        # Partition out the top_k scores in O(N) and only sort those
+        order = np.argpartition(-similarities, top_k - 1)[:top_k]
+        order = order[np.argsort(-similarities[order], kind="stable")]
+    else:
+        order = np.argsort(-similarities, kind="stable")
+    return [{"indicator": indicator_names[i], "score": float(similarities[i])} for i in order]
+
+def load_document_embeddings(model, documents, metadata_path, model_name):
+    """
+    Loads L2-normalised float32 document embeddings from a .npy cache next to
+    the metadata file, keyed by the model name and a hash of the file contents,
+    or encodes the documents and writes it.
+    """
+    with open(metadata_path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    cache_path = os.path.join(os.path.dirname(metadata_path), f'.embed_cache_{model_name}_{digest}.npy')
+    if os.path.exists(cache_path):
+        embeddings = np.load(cache_path)
+        if embeddings.shape[0] == len(documents):
+            return embeddings
+    # Both encoders sort documents by length before batching, so batches pad to similar lengths
+    embeddings = model.encode(documents, batch_size=64, show_progress_bar=False, convert_to_numpy=True,
+                              normalize_embeddings=True).astype(np.float32)
+    try:
+        np.save(cache_path, embeddings)
+    except OSError as e:
+        print(f"Could not write embeddings cache: {e}")
+    return embeddings
 
-    # Sort by score in descending order
-    ranked_results = sorted(results, key=lambda x: x['score'], reverse=True)
-    return ranked_results
+def load_sentence_model():
+    """
+    Prefers the int8 ONNX Runtime export of the model (see onnx_encoder.py)
+    and falls back to the PyTorch SentenceTransformer if it is not available.
+    Returns the model and a name used to key the embeddings cache.
+    """
+    try:
+        from onnx_encoder import OnnxSentenceEncoder, ONNX_MODEL_DIR, ONNX_MODEL_FILE
+        if os.path.exists(os.path.join(ONNX_MODEL_DIR, ONNX_MODEL_FILE)):
+            return OnnxSentenceEncoder(ONNX_MODEL_DIR), 'all-MiniLM-L6-v2-int8'
+    except ImportError as e:
+        print(f"ONNX Runtime encoder unavailable ({e}), using PyTorch model.")
+    return SentenceTransformer('all-MiniLM-L6-v2'), 'all-MiniLM-L6-v2'
 
 # --- Pre-load model and data ONCE on server startup for efficiency ---
 print("Backend server is starting...")
@@ -63,9 +102,9 @@ METADATA = load_metadata_from_json(JSON_FILEPATH)
 if METADATA:
     INDICATOR_NAMES, DOCUMENTS = create_documents_from_metadata(METADATA)
     print("Loading sentence transformer model (this may take a moment)...")
-    MODEL = SentenceTransformer('all-MiniLM-L6-v2')
-    print("Creating embeddings for the knowledge base...")
-    DOCUMENT_EMBEDDINGS = MODEL.encode(DOCUMENTS)
+    MODEL, MODEL_NAME = load_sentence_model()
+    print("Loading embeddings for the knowledge base...")
+    DOCUMENT_EMBEDDINGS = load_document_embeddings(MODEL, DOCUMENTS, JSON_FILEPATH, MODEL_NAME)
     print("✅ Backend ready.")
 else:
     print("❌ ERROR: Could not load metadata. Backend cannot process requests.")
@@ -83,9 +122,12 @@ def search_indicators():
         return jsonify({"error": "Missing 'query' in request body"}), 400
 
     user_query = data['query']
+    top_k = data.get('topK')
+    if top_k is not None and (isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1):
+        return jsonify({"error": "'topK' must be a positive integer"}), 400
 
-    # Get the ranked list of indicators
-    ranked_indicators = find_ranked_indicators(user_query, MODEL, INDICATOR_NAMES, DOCUMENT_EMBEDDINGS)
+    # Get the ranked list of indicators (all of them unless topK is given)
+    ranked_indicators = find_ranked_indicators(user_query, MODEL, INDICATOR_NAMES, DOCUMENT_EMBEDDINGS, top_k)
 
     return jsonify(ranked_indicators)
 
@@ -98,61 +140,81 @@ def search_indicators():
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 DATA_DIR = os.path.join(BASE_DIR, 'public', 'data')
 
-def load_geojson(path):
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+def read_layer(path):
+    """
+    Read a vector layer into a GeoDataFrame through pyogrio's columnar reader.
+    The CRS comes from the file itself; GeoJSON without a crs member is
+    treated as WGS84 (CRS84).
+    """
+    gdf = pyogrio.read_dataframe(path)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(4326)
+    return gdf
 
-def guess_epsg_from_geojson(fc):
+# Reprojected layers are memoised per process (with the source mtime) and persisted as GeoParquet
+CACHE_DIR = os.path.join(BASE_DIR, '.cache')
+_LAYER_CACHE = {}
+
+def load_layer_3857(path):
     """
-    Best-effort EPSG extraction from a GeoJSON's crs.name value.
-    Falls back to 4326 (WGS84/CRS84) if missing/unknown.
-    Handles patterns like:
-      - urn:ogc:def:crs:EPSG::4283
-      - EPSG:7844
-      - urn:ogc:def:crs:OGC:1.3:CRS84
+    Returns the layer at path reprojected to EPSG:3857. The result is kept in
+    memory and written to CACHE_DIR as GeoParquet, so repeated requests (and
+    later restarts) skip GeoJSON parsing and reprojection. Both copies are
+    rebuilt whenever the source file is newer, and an unreadable on-disk copy
+    is rebuilt from the source.
     """
-    name = str((fc.get('crs', {}).get('properties', {}) or {}).get('name', ''))
-    upper = name.upper()
-    # Direct EPSG numeric detection
-    m = re.search(r"EPSG(?:::|:)[^0-9]*(\d+)", name, re.IGNORECASE)
-    if m:
+    mtime = os.path.getmtime(path)
+    cached = _LAYER_CACHE.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    # Name the on-disk copy after the full source path so same-named layers do not collide
+    path_key = hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cache_path = os.path.join(CACHE_DIR, f'{stem}_{path_key}_3857.parquet')
+    gdf = None
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= mtime:
+        try:
+            gdf = gpd.read_parquet(cache_path)
+        except Exception as e:
+            print(f"[Overlay] Could not read layer cache {cache_path} ({e}); rebuilding it")
+    if gdf is None:
+        src = read_layer(path)
+        print(f"[Overlay] Reprojecting {os.path.basename(path)} from EPSG:{src.crs.to_epsg()} to EPSG:3857")
+        gdf = src.to_crs(3857)
+        # Write to a temporary file and rename it into place, so an interrupted write
+        # never leaves a partial cache that looks newer than the source
+        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
         try:
-            return int(m.group(1))
-        except Exception:
-            pass
-    # Common aliases
-    if 'CRS84' in upper:
-        return 4326
-    if 'EPSG::4283' in upper or 'EPSG:4283' in upper or 'GDA94' in upper:
-        return 4283
-    if 'EPSG::7844' in upper or 'EPSG:7844' in upper or 'GDA2020' in upper:
-        return 7844
-    # Default to WGS84
-    return 4326
-
-def transform_coords(coords, transformer):
-    # Recursively apply transform to nested ring lists
-    if not isinstance(coords, list):
-        return coords
-    if len(coords) == 0:
-        return coords
-    if isinstance(coords[0], (int, float)) and len(coords) == 2:
-        x, y = coords  # x=lon, y=lat
-        X, Y = transformer.transform(x, y)  # always_xy=True => expects lon,lat
-        return [X, Y]
-    return [transform_coords(c, transformer) for c in coords]
-
-def reproject_feature_geometry(feat_geom, src_epsg, dst_epsg=3857):
-    # Ensure axis order lon,lat by setting always_xy=True
-    transformer = Transformer.from_crs(CRS.from_epsg(src_epsg), CRS.from_epsg(dst_epsg), always_xy=True)
-    gtype = feat_geom.get('type')
-    if gtype == 'Polygon':
-        new_coords = transform_coords(feat_geom['coordinates'], transformer)
-        return { 'type': 'Polygon', 'coordinates': new_coords }
-    if gtype == 'MultiPolygon':
-        new_coords = transform_coords(feat_geom['coordinates'], transformer)
-        return { 'type': 'MultiPolygon', 'coordinates': new_coords }
-    return feat_geom
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            gdf.to_parquet(tmp_path)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"[Overlay] Could not write layer cache {cache_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    _LAYER_CACHE[path] = (mtime, gdf)
+    return gdf
+
+def intersection_areas(gdf, geom):
+    """
+    Returns the positions of the features in gdf that intersect geom (in layer
+    order) and the area of each intersection. The STRtree and GEOS calls are
+    vectorised; if an invalid feature makes GEOS fail, the bbox candidates are
+    intersected one by one and the failing features get area 0 (skipped).
+    """
+    try:
+        idxs = np.sort(gdf.sindex.query(geom, predicate='intersects'))
+        return idxs, gdf.geometry.iloc[idxs].intersection(geom).area.to_numpy()
+    except GEOSException as e:
+        print(f"[Overlay] Vectorised intersection failed ({e}); intersecting features one by one")
+    idxs = np.sort(gdf.sindex.query(geom))
+    areas = np.zeros(len(idxs))
+    for i, shp in enumerate(gdf.geometry.iloc[idxs]):
+        try:
+            areas[i] = shp.intersection(geom).area if shp is not None else 0.0
+        except GEOSException:
+            continue
+    return idxs, areas
 
 @app.route('/api/precinct_overlay', methods=['POST'])
 def precinct_overlay():
@@ -178,79 +240,40 @@ def precinct_overlay():
         print(f"[Overlay] precincts_path={precincts_path}")
         print(f"[Overlay] jobs_path={jobs_path}")
 
-        precincts_fc = load_geojson(precincts_path)
-        jobs_fc = load_geojson(jobs_path)
-
-        # EPSG detection
-        precinct_epsg = guess_epsg_from_geojson(precincts_fc)
-        jobs_epsg = guess_epsg_from_geojson(jobs_fc)
-        print(f"[Overlay] EPSG precinct={precinct_epsg}, jobs={jobs_epsg}")
+        code_prop = {2011: 'DZN_CODE11', 2016: 'DZN_CODE16', 2021: 'DZN_CODE21'}[year]
+        val_prop = {2011: 'TotJob_11', 2016: 'TotJob_16', 2021: 'TotJob_21'}[year]
+        precincts_gdf = load_layer_3857(precincts_path)
+        jobs_gdf = load_layer_3857(jobs_path)
 
         # Find the requested precinct feature(s)
-        p_feats = [f for f in precincts_fc.get('features', []) if (f.get('properties', {}).get('name') == precinct_name)]
-        print(f"[Overlay] Found {len(p_feats)} matching precinct feature(s)")
-        if not p_feats:
+        p_gdf = precincts_gdf[precincts_gdf['name'] == precinct_name]
+        print(f"[Overlay] Found {len(p_gdf)} matching precinct feature(s)")
+        if p_gdf.empty:
             return jsonify({'error': f'Precinct {precinct_name} not found'}), 404
 
-        # Reproject precinct to 3857 and union into single geometry
-        p_geoms = []
-        for f in p_feats:
-            g = reproject_feature_geometry(f['geometry'], precinct_epsg, 3857)
-            try:
-                shp = shape(g)
-                if not shp.is_empty and shp.area > 0:
-                    p_geoms.append(shp)
-            except Exception:
-                continue
+        # Union precinct (already in 3857) into single geometry
+        p_geoms = [shp for shp in p_gdf.geometry if shp is not None and not shp.is_empty and shp.area > 0]
         if not p_geoms:
             return jsonify({'error': 'Precinct geometry invalid after reprojection'}), 500
 
         p_union = unary_union(p_geoms)
-        p_prep = prep(p_union)
         p_area = float(p_union.area)
         print(f"[Overlay] Precinct area (m^2) = {p_area:.2f}")
 
-        # Prepare outputs
-        code_prop = {2011: 'DZN_CODE11', 2016: 'DZN_CODE16', 2021: 'DZN_CODE21'}[year]
-        val_prop = {2011: 'TotJob_11', 2016: 'TotJob_16', 2021: 'TotJob_21'}[year]
-        intersections = []
-
-        # Iterate DZN features
-        feats = jobs_fc.get('features', [])
-        print(f"[Overlay] DZN feature count = {len(feats)}")
-        for f in feats:
-            g = f.get('geometry')
-            if not g:
-                continue
-            try:
-                g_reproj = reproject_feature_geometry(g, jobs_epsg, 3857)
-                shp = shape(g_reproj)
-                if shp.is_empty or shp.area <= 0:
-                    continue
-                if not p_prep.intersects(shp):
-                    continue
-                inter = p_union.intersection(shp)
-                if inter.is_empty:
-                    continue
-                a = float(inter.area)
-                if a <= 0:
-                    continue
-                code = f.get('properties', {}).get(code_prop, '')
-                val = f.get('properties', {}).get(val_prop, 0)
-                try:
-                    val = float(val)
-                except Exception:
-                    val = 0.0
-                intersections.append({
-                    'code': code,
-                    'value': val,
-                    'area': a,
-                    'areaPct': a / p_area if p_area > 0 else 0.0
-                })
-            except Exception:
-                continue
-
-        intersections.sort(key=lambda i: i['areaPct'], reverse=True)
+        # Intersect DZN features with the precinct: the layer's STRtree returns only
+        # features that intersect it, which GEOS then intersects in one vectorised call
+        print(f"[Overlay] DZN feature count = {len(jobs_gdf)}")
+        idxs, areas = intersection_areas(jobs_gdf, p_union)
+        candidates = jobs_gdf.iloc[idxs]
+        overlay = pd.DataFrame({
+            'code': candidates[code_prop].fillna('').to_numpy(),
+            'value': pd.to_numeric(candidates[val_prop], errors='coerce').fillna(0.0).astype(float).to_numpy(),
+            'area': areas,
+            'areaPct': areas / p_area if p_area > 0 else 0.0
+        })[areas > 0]
+        overlay = overlay.sort_values('areaPct', ascending=False, kind='stable')
+        intersections = overlay.to_dict('records')
+
         result = {
             'precinct': precinct_name,
             'year': year,
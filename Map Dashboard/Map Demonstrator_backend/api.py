@@ -1,12 +1,11 @@
 from __future__ import annotations
 
-import json
 import tempfile
 from pathlib import Path
 
 from fastapi import FastAPI, File, Form, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 
 # Dynamic import of indicator-generator.py (filename has a hyphen)
 import importlib.util
@@ -85,13 +84,13 @@ async def generate(
         except Exception:
             pass
 
+    # GDAL has already encoded the GeoJSON; return its bytes instead of parsing and re-serialising them
     try:
-        with open(out_path, "r", encoding="utf-8") as f:
-            geojson_obj = json.load(f)
+        geojson_bytes = Path(out_path).read_bytes()
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Failed to read output GeoJSON: {exc}")
 
-    return JSONResponse(content=geojson_obj, media_type="application/geo+json")
+    return Response(content=geojson_bytes, media_type="application/geo+json")
 
 
 @app.get("/health")
@@ -3,34 +3,58 @@
 import argparse
 import csv
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 try:
-    import fiona
+    import geopandas as gpd
+    import numpy as np
+    import pandas as pd
+    import pyogrio
 except Exception as exc:
     raise SystemExit(
-        "Fiona is required to run this script. Install it with 'pip install fiona' or 'conda install -c conda-forge fiona'.\n"
+        "pyogrio is required to run this script. Install it with 'pip install pyogrio geopandas' or 'conda install -c conda-forge pyogrio geopandas'.\n"
         f"Import error: {exc}"
     )
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except Exception as exc:
+    raise SystemExit(
+        "pyarrow is required to run this script. Install it with 'pip install pyarrow' or 'conda install -c conda-forge pyarrow'.\n"
+        f"Import error: {exc}"
+    )
+
+
+_NON_DIGIT_RE = re.compile(r"\D")
+
 
 def norm_sa1(x: str) -> str:
-    s = "".join(ch for ch in str(x) if ch.isdigit())
-    if len(s) < 11:
-        s = s.zfill(11)
-    return s
+    return _NON_DIGIT_RE.sub("", str(x)).zfill(11)
 
 
 def norm_dzn(x: str) -> str:
     """Normalise DZN codes to a simple digit string (typically 9 digits)."""
-    s = "".join(ch for ch in str(x) if ch.isdigit())
-    return s
+    return _NON_DIGIT_RE.sub("", str(x))
 
 
 def norm_mb(x: str) -> str:
     """Normalise MB codes to a digit string."""
-    s = "".join(ch for ch in str(x) if ch.isdigit())
-    return s
+    return _NON_DIGIT_RE.sub("", str(x))
+
+
+def norm_codes(values, *, width: int = 0):
+    """Vectorised norm_sa1/norm_dzn/norm_mb over an Arrow string array.
+
+    Strips non-digits and left-pads with zeros to ``width`` in Arrow's native
+    string kernels (norm_sa1 corresponds to width=11).
+    """
+    digits = pc.replace_substring_regex(pc.fill_null(values, ""), pattern=r"\D", replacement="")
+    return pc.utf8_lpad(digits, width=width, padding="0") if width else digits
 
 
 DATASETS = {
@@ -52,6 +76,38 @@ DATASETS = {
 }
 
 
+# ANZSIC industry divisions used by the jobs indicators (matched against the CSV header)
+INDUSTRY_COLUMNS = [
+    "Agriculture, Forestry and Fishing",
+    "Mining",
+    "Manufacturing",
+    "Electricity, Gas, Water and Waste Services",
+    "Construction",
+    "Wholesale Trade",
+    "Retail Trade",
+    "Accommodation and Food Services",
+    "Transport, Postal and Warehousing",
+    "Information Media and Telecommunications",
+    "Financial and Insurance Services",
+    "Rental, Hiring and Real Estate Services",
+    "Professional, Scientific and Technical Services",
+    "Administrative and Support Services",
+    "Public Administration and Safety",
+    "Education and Training",
+    "Health Care and Social Assistance",
+    "Arts and Recreation Services",
+    "Other Services",
+]
+
+# Output format -> (OGR driver, file extension). GeoJSON stays the default; GeoJSONSeq
+# (RFC 8142) can be read as a stream and FlatGeobuf is smaller and spatially indexed.
+OUTPUT_FORMATS = {
+    "geojson": ("GeoJSON", ".geojson"),
+    "geojsonseq": ("GeoJSONSeq", ".geojsons"),
+    "fgb": ("FlatGeobuf", ".fgb"),
+}
+
+
 def resolve_paths(data_dir: Path, *, scale: str):
     base = Path(data_dir).expanduser()
     shp_candidates: list[str]
@@ -90,31 +146,39 @@ def parse_target_ids(ids_arg: str | None, ids_file: str | None):
     return set()
 
 
-def detect_id_field(row: dict, *, scale: str) -> str | None:
-    sa1_candidates = ["SA1 (UR)", "SA1_CODE21", "SA1_CODE_2021", "SA1_CODE", "SA1_2021"]
-    dzn_candidates = ["DZN_21", "DZN_CODE21", "DZN_CODE_2021", "DZN_CODE"]
-    mb_candidates = ["MB_CODE21", "MB_CODE_2021", "MB_CODE"]
-    candidates = dzn_candidates if scale == "dzn" else (mb_candidates if scale == "mb" else sa1_candidates)
-    for k in candidates:
-        if k in row and str(row[k]).strip():
-            return k
-    # Heuristic fallback: any column name containing 'dzn' or 'sa1'
-    for k in row.keys():
-        if scale == 'dzn' and 'dzn' in k.lower():
-            return k
-        if scale == 'mb' and 'mb_code' in k.lower():
+# Known identifier columns per spatial scale, in order of preference
+ID_FIELD_CANDIDATES = {
+    "sa1": ("SA1 (UR)", "SA1_CODE21", "SA1_CODE_2021", "SA1_CODE", "SA1_2021"),
+    "dzn": ("DZN_21", "DZN_CODE21", "DZN_CODE_2021", "DZN_CODE"),
+    "mb": ("MB_CODE21", "MB_CODE_2021", "MB_CODE"),
+}
+# Substring used to recognise an identifier column when no candidate matches
+ID_FIELD_HINTS = {"sa1": "sa1", "dzn": "dzn", "mb": "mb_code"}
+
+
+def detect_id_field(header, *, scale: str) -> str | None:
+    """Pick the identifier column for ``scale`` from a CSV header (column names).
+
+    The header is fixed for the whole file, so callers detect the field once.
+    """
+    names = frozenset(header)
+    for k in ID_FIELD_CANDIDATES[scale]:
+        if k in names:
             return k
-        if scale == 'sa1' and 'sa1' in k.lower():
+    # Heuristic fallback: any column name containing 'dzn', 'mb_code' or 'sa1'
+    hint = ID_FIELD_HINTS[scale]
+    for k in header:
+        if hint in k.lower():
             return k
     return None
 
 
-def detect_scale_from_header(row: dict) -> str | None:
+def detect_scale_from_header(header) -> str | None:
     """Infer the spatial scale from CSV header keys if possible.
 
     Returns one of 'dzn' | 'mb' | 'sa1' | None.
     """
-    keys = set(k.lower() for k in row.keys())
+    keys = set(k.lower() for k in header)
     if any(k in keys for k in ["dzn_21", "dzn_code21", "dzn_code_2021", "dzn_code", "dznid"]):
         return "dzn"
     if any(k in keys for k in ["mb_code21", "mb_code_2021", "mb_code"]):
@@ -124,39 +188,116 @@ def detect_scale_from_header(row: dict) -> str | None:
     return None
 
 
+def read_csv_table(csv_path: Path) -> pa.Table:
+    """Parse a CSV with Arrow's multithreaded C reader, keeping every column as text.
+
+    Values stay strings (as with csv.DictReader) so codes keep leading zeros and
+    attributes are written out exactly as they appear in the CSV.
+    """
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+    convert = pacsv.ConvertOptions(column_types={name: pa.string() for name in header})
+    return pacsv.read_csv(str(csv_path), convert_options=convert)
+
+
+# Normalised SA1 code column added to cached CLI tables (sorted on it, so Parquet row-group
+# min/max statistics let filtered reads skip whole row groups)
+NORM_CODE_COLUMN = "__sa1_code__"
+
+
+def load_sa1_table(csv_path: Path, target_ids: set[str] | None = None) -> pa.Table:
+    """Read an SA1 dataset CSV with its codes normalised into NORM_CODE_COLUMN.
+
+    The parsed, normalised table is cached as Parquet under ``.cache/`` next to the CSV
+    and reused while it is newer than the CSV; the target ID filter is then pushed down
+    into the Parquet reader. An unreadable cache is rebuilt from the CSV. Rows with
+    equal codes keep their CSV order.
+    """
+    csv_path = Path(csv_path)
+    cache = csv_path.parent / ".cache" / f"{csv_path.stem}.parquet"
+    if cache.exists() and cache.stat().st_mtime >= csv_path.stat().st_mtime:
+        filters = [(NORM_CODE_COLUMN, "in", sorted(target_ids))] if target_ids else None
+        try:
+            return pq.read_table(cache, filters=filters)
+        except (pa.ArrowInvalid, OSError) as exc:
+            print(f"Could not read CSV cache {cache} ({exc}); rebuilding it from {csv_path.name}")
+
+    table = read_csv_table(csv_path)
+    if table.num_rows == 0:
+        raise ValueError(f"No rows read from CSV: {csv_path}")
+    sa1_field = detect_id_field(table.column_names, scale='sa1')
+    if not sa1_field:
+        raise KeyError(
+            f"Could not detect SA1 column in {csv_path}. Expected one of 'SA1 (UR)', 'SA1_CODE21', etc."
+        )
+    table = table.append_column(NORM_CODE_COLUMN, norm_codes(table.column(sa1_field), width=11))
+    table = table.take(pc.sort_indices(table, sort_keys=[(NORM_CODE_COLUMN, "ascending")]))
+    # Write to a temporary file and rename it into place, so an interrupted run never
+    # leaves a partial cache that looks newer than the CSV
+    tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+    try:
+        cache.parent.mkdir(exist_ok=True)
+        pq.write_table(table, tmp)
+        os.replace(tmp, cache)
+    except OSError as exc:
+        print(f"Could not write CSV cache {cache}: {exc}")
+        tmp.unlink(missing_ok=True)
+    if target_ids:
+        keep = pc.is_in(table.column(NORM_CODE_COLUMN), value_set=pa.array(sorted(target_ids), pa.string()))
+        table = table.filter(keep)
+    return table
+
+
+# The WHERE pushdown is one layer scan testing an OGR IN list linearly per record; it only
+# beats reading the key column of every feature for ID sets small relative to the layer
+MAX_WHERE_IDS = 200
+MAX_WHERE_FRACTION = 0.05
+
+
 def load_target_features(shp_path: Path, key_field: str | None, target_ids: set[str] | None, *, scale: str):
     """Read shapefile and cache geometry for matching IDs (if provided).
 
     - If key_field is None, auto-detect the most likely ID field from the schema.
     - If target_ids is empty or None, include all features and return a mapping from
       normalised code -> geometry.
+    - Small ID sets (at most MAX_WHERE_IDS codes and MAX_WHERE_FRACTION of the layer)
+      are pushed down to GDAL as one WHERE clause, so only the matching records are
+      decoded. Larger sets, or a filter the driver rejects, read all features and
+      filter here.
     """
-    cached = {}
-    with fiona.open(str(shp_path)) as src:
-        crs = src.crs
-        props_schema = set((src.schema or {}).get("properties", {}).keys())
-        if key_field is None or key_field not in props_schema:
-            candidates = {
-                'dzn': ["DZN_21", "DZN_CODE21", "DZN_CODE_2021", "DZN_CODE", "DZN_2021", "DZNID"],
-                'sa1': ["SA1_CODE21", "SA1_2021", "SA1_CODE_2021", "SA1_CODE", "SA1 (UR)"],
-                'mb': ["MB_CODE21", "MB_CODE_2021", "MB_CODE"],
-            }[scale]
-            for c in candidates:
-                if c in props_schema:
-                    key_field = c
-                    break
-        if key_field is None:
-            raise KeyError(
-                f"Could not detect key field in shapefile {shp_path.name}. Available fields: {sorted(list(props_schema))}"
-            )
+    info = pyogrio.read_info(str(shp_path))
+    field_types = dict(zip(info["fields"], info["dtypes"]))
+    if key_field not in field_types:
+        candidates = {
+            'dzn': ["DZN_21", "DZN_CODE21", "DZN_CODE_2021", "DZN_CODE", "DZN_2021", "DZNID"],
+            'sa1': ["SA1_CODE21", "SA1_2021", "SA1_CODE_2021", "SA1_CODE", "SA1 (UR)"],
+            'mb': ["MB_CODE21", "MB_CODE_2021", "MB_CODE"],
+        }[scale]
+        key_field = next((c for c in candidates if c in field_types), None)
+    if key_field is None:
+        raise KeyError(
+            f"Could not detect key field in shapefile {shp_path.name}. Available fields: {sorted(field_types)}"
+        )
+
+    # Codes are stored as text in the ABS shapefiles; numeric key fields are filtered after reading
+    gdf = None
+    max_where = MAX_WHERE_IDS if info["features"] < 0 else min(MAX_WHERE_IDS, info["features"] * MAX_WHERE_FRACTION)
+    if target_ids and len(target_ids) <= max_where and field_types[key_field] == "object":
+        where = f'"{key_field}" IN (' + ",".join("'" + i.replace("'", "''") + "'" for i in sorted(target_ids)) + ")"
+        try:
+            gdf = pyogrio.read_dataframe(str(shp_path), columns=[key_field], where=where)
+        except ValueError:
+            print(f"WHERE filter rejected for {shp_path.name}; reading all features instead")
+    if gdf is None:
+        gdf = pyogrio.read_dataframe(str(shp_path), columns=[key_field])
 
-        norm = norm_dzn if scale == 'dzn' else (norm_mb if scale == 'mb' else norm_sa1)
-        for feat in src:
-            prop_val = feat["properties"].get(key_field, "")
-            code = norm(prop_val)
-            if not target_ids or code in target_ids:
-                cached[code] = feat["geometry"]
-    return crs, cached
+    norm = norm_dzn if scale == 'dzn' else (norm_mb if scale == 'mb' else norm_sa1)
+    cached = {}
+    for prop_val, geom in zip(gdf[key_field], gdf.geometry):
+        code = norm(prop_val)
+        if not target_ids or code in target_ids:
+            cached[code] = geom
+    return gdf.crs, cached
 
 
 def generate_geojson_from_csv(
@@ -167,6 +308,7 @@ def generate_geojson_from_csv(
     target_ids: set[str] | None = None,
     out_dir: Path | None = None,
     scale: str | None = None,
+    out_format: str = "geojson",
 ) -> Path:
     """
     Programmatic API: Generate a GeoJSON for a single dataset using an explicit CSV file.
@@ -177,13 +319,17 @@ def generate_geojson_from_csv(
     - data_dir: directory containing the SA1 shapefile (SA1_2021_AUST_GDA2020.shp)
     - target_ids: set of SA1 codes to include; if None, defaults to script's default subset
     - out_dir: directory to write output; defaults to data_dir
+    - out_format: one of {geojson, geojsonseq, fgb}; defaults to geojson
 
-    Returns: Path to the generated GeoJSON file.
+    Returns: Path to the generated file.
     """
     d = dataset.strip().lower()
     if d not in DATASETS:
         valid = ", ".join(DATASETS.keys())
         raise ValueError(f"Unknown dataset: {dataset}. Valid: {valid}")
+    if out_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {out_format}. Use one of {'|'.join(OUTPUT_FORMATS)}")
+    driver, ext = OUTPUT_FORMATS[out_format]
 
     # Determine scale if not explicitly provided
     if scale:
@@ -212,20 +358,19 @@ def generate_geojson_from_csv(
 
     out_dir = Path(out_dir or base).expanduser()
     out_dir.mkdir(parents=True, exist_ok=True)
-    out_path = out_dir / f"selected_{scale}_{d.replace(' ', '_')}.geojson"
+    out_path = out_dir / f"selected_{scale}_{d.replace(' ', '_')}{ext}"
 
-    # Load CSV for this dataset
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-    if not rows:
+    # Load CSV for this dataset (columnar, all values kept as text)
+    table = read_csv_table(csv_path)
+    header = table.column_names
+    if table.num_rows == 0:
         raise ValueError(f"No rows read from CSV: {csv_path}")
 
-    # Detect join field and build lookup
-    id_field = detect_id_field(rows[0], scale=scale)
+    # Detect join field and index the rows by normalised ID (last duplicate wins)
+    id_field = detect_id_field(header, scale=scale)
     if not id_field:
         # Try to infer scale from header and provide a clear error on mismatch
-        csv_scale = detect_scale_from_header(rows[0])
+        csv_scale = detect_scale_from_header(header)
         if csv_scale and csv_scale != scale:
             raise ValueError(
                 f"Spatial scale mismatch: CSV appears to use '{csv_scale.upper()}' identifiers but you selected '{scale.upper()}'."
@@ -235,112 +380,98 @@ def generate_geojson_from_csv(
         raise KeyError(
             f"Could not detect identifier column in {csv_path}. Expected something like {expected}."
         )
-    norm_fn = norm_dzn if scale == 'dzn' else (norm_mb if scale == 'mb' else norm_sa1)
     id_key = {"dzn": "DZN_21", "sa1": "SA1_CODE21", "mb": "MB_CODE21"}[scale]
-    for r in rows:
-        r[id_key] = norm_fn(r.get(id_field, ""))
-    by_id = {r[id_key]: {k: r[k] for k in r if k != id_key} for r in rows}
+    frame = table.to_pandas()
+    frame.index = norm_codes(table.column(id_field), width=11 if scale == "sa1" else 0).to_pylist()
+    frame = frame[~frame.index.duplicated(keep="last")]
 
     # Derive target IDs from CSV when not provided
     if not target_ids:
-        target_ids = set(by_id.keys())
+        target_ids = set(frame.index)
 
     # Load target geometries for provided/derived ids
     crs, target_geoms = load_target_features(shp_path, key_field=id_key, target_ids=target_ids, scale=scale)
     if not target_geoms:
         raise ValueError("No target geometries found in shapefile for the provided IDs.")
 
-    # Build schema (allow mixed Polygon/MultiPolygon)
-    prop_keys = [k for k in rows[0].keys() if k != id_key]
-    # Ensure ID and computed fields are present
-    out_schema = {"geometry": "Unknown", "properties": {(
-        "DZN_21" if scale == 'dzn' else ("MB_CODE21" if scale == 'mb' else "SA1_CODE")
-    ): "str"}}
-    for k in prop_keys:
-        out_schema["properties"][k] = "str"
-    # Placeholder for computed Industry Specialisation
-    if d in {"industry specialisation", "industry_specialisation", "industryspecialisation"}:
-        out_schema["properties"]["Industry Specialisation_21"] = "float"
-    # Placeholder for computed Total number of jobs (2021)
+    prop_keys = [k for k in header if k != id_key]
     is_tot_jobs = d in {"total number of jobs", "total_jobs", "jobs_total"}
-    if is_tot_jobs:
-        out_schema["properties"]["Total number of jobs_2021"] = "float"
+    is_ind_spec = d in {"industry specialisation", "industry_specialisation", "industryspecialisation"}
+    # Industry columns present in this CSV (the header is fixed for the whole run)
+    industry_cols = [c for c in INDUSTRY_COLUMNS if c in header]
+
+    def numeric_matrix(records, cols):
+        """Parse the given CSV columns of each record into a float matrix (thousands
+        separators stripped; missing or non-numeric cells count as 0)."""
+        if not cols:
+            return np.zeros((len(records), 0))
+        return (
+            records[cols]
+            .apply(lambda s: pd.to_numeric(s.str.replace(",", ""), errors="coerce"))
+            .fillna(0.0)
+            .to_numpy(dtype=np.float64)
+        )
 
-    # Write GeoJSON using cached geometries
-    def try_float(x):
-        try:
-            return float(str(x).replace(",", ""))
-        except Exception:
-            return None
-
-    # Predefine industry columns (match if present in CSV header)
-    INDUSTRY_COLUMNS = [
-        "Agriculture, Forestry and Fishing",
-        "Mining",
-        "Manufacturing",
-        "Electricity, Gas, Water and Waste Services",
-        "Construction",
-        "Wholesale Trade",
-        "Retail Trade",
-        "Accommodation and Food Services",
-        "Transport, Postal and Warehousing",
-        "Information Media and Telecommunications",
-        "Financial and Insurance Services",
-        "Rental, Hiring and Real Estate Services",
-        "Professional, Scientific and Technical Services",
-        "Administrative and Support Services",
-        "Public Administration and Safety",
-        "Education and Training",
-        "Health Care and Social Assistance",
-        "Arts and Recreation Services",
-        "Other Services",
-    ]
+    # Assemble the output layer column-wise from cached geometries and write it in one call
+    id_col = {"dzn": "DZN_21", "mb": "MB_CODE21"}.get(scale, "SA1_CODE")
+    # target_geoms only holds matched IDs, so iterate it rather than the (possibly larger) target set
+    codes = [code for code, geom in target_geoms.items() if geom is not None and not geom.is_empty]
+    records = frame.reindex(codes)
+    columns = {id_col: codes}
+    # Copy attributes as strings (empty for IDs missing from the CSV)
+    for k in prop_keys:
+        columns[k] = records[k].fillna("").to_numpy()
+    if is_ind_spec:
+        # Industry columns available in this CSV; fallback: all columns except id
+        cols = industry_cols or [k for k in header if k != id_key]
+        ind_mat = numeric_matrix(records, cols)
+        totals = ind_mat.sum(axis=1)
+        # Sum of squared shares, sum((v / t) ** 2) == sum(v ** 2) / t ** 2, without a shares matrix
+        sum_sq = np.einsum("ij,ij->i", ind_mat, ind_mat)
+        columns["Industry Specialisation_21"] = np.where(totals > 0, sum_sq / np.where(totals > 0, totals * totals, 1.0), 0.0)
+    if is_tot_jobs:
+        # Total number of jobs: sum over industry columns
+        columns["Total number of jobs_2021"] = numeric_matrix(records, industry_cols).sum(axis=1)
+    gdf = gpd.GeoDataFrame(columns, geometry=[target_geoms[code] for code in codes], crs=crs)
+    pyogrio.write_dataframe(gdf, str(out_path), driver=driver)
 
-    is_ind_spec = d in {"industry specialisation", "industry_specialisation", "industryspecialisation"}
+    return out_path
 
-    with fiona.open(str(out_path), "w", driver="GeoJSON", crs=crs, schema=out_schema) as dst:
-        for code in target_ids:
-            geom = target_geoms.get(code)
-            if not geom:
-                continue
-            attrs = by_id.get(code, {})
-            props = {k: "" for k in out_schema["properties"].keys()}
-            # Write ID under appropriate name
-            if scale == 'dzn':
-                props["DZN_21"] = code
-            elif scale == 'mb':
-                props["MB_CODE21"] = code
-            else:
-                props["SA1_CODE"] = code
-
-            # Copy attributes as strings
-            for k in prop_keys:
-                if k in attrs:
-                    props[k] = str(attrs[k])
-
-            # Compute Industry Specialisation if requested
-            if is_ind_spec:
-                # Choose available columns in this CSV
-                cols = [c for c in INDUSTRY_COLUMNS if c in attrs]
-                if not cols:
-                    # Fallback: use all numeric columns except id
-                    cols = [k for k, v in attrs.items() if try_float(v) is not None and k not in {id_key}]
-                vals = [try_float(attrs.get(c)) or 0.0 for c in cols]
-                total = sum(vals)
-                ind_val = 0.0
-                if total > 0:
-                    ind_val = sum(((v / total) ** 2 for v in vals))
-                props["Industry Specialisation_21"] = ind_val
-
-            # Compute Total number of jobs (sum over industry columns)
-            if is_tot_jobs:
-                cols_jobs = [c for c in INDUSTRY_COLUMNS if c in attrs]
-                vals_jobs = [try_float(attrs.get(c)) or 0.0 for c in cols_jobs]
-                total_jobs = float(sum(vals_jobs))
-                props["Total number of jobs_2021"] = total_jobs
-
-            dst.write({"type": "Feature", "geometry": geom, "properties": props})
 
+def process_one_dataset(
+    d: str,
+    base: Path,
+    target_ids: set[str],
+    codes: list[str],
+    geoms,
+    crs,
+    *,
+    out_format: str = "geojson",
+) -> Path:
+    """Join one SA1 dataset CSV onto the cached target geometries and write it (CLI worker)."""
+    driver, ext = OUTPUT_FORMATS[out_format]
+    csv_path = (base / DATASETS[d]).expanduser()
+    out_path = (base / f"selected_sa1_{d}{ext}").expanduser()
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Load CSV for this dataset (from its Parquet cache when up to date); only target SA1s
+    # are written out, so other rows are dropped before pulling values into Python
+    table = load_sa1_table(csv_path, target_ids)
+
+    # Build lookup of SA1 -> row values (in prop_keys order)
+    prop_keys = [k for k in table.column_names if k not in {"SA1_CODE21", NORM_CODE_COLUMN}]
+    sa1_codes = table.column(NORM_CODE_COLUMN).to_pylist()
+    by_sa1 = dict(zip(sa1_codes, zip(*(table.column(k).to_pylist() for k in prop_keys))))
+
+    # Assemble the output layer column-wise from cached geometries and write it in one call
+    empty = ("",) * len(prop_keys)
+    rows = [by_sa1.get(sa1, empty) for sa1 in codes]
+    columns = {"SA1_CODE": codes}
+    columns.update((k, [r[i] for r in rows]) for i, k in enumerate(prop_keys))
+    gdf = gpd.GeoDataFrame(columns, geometry=geoms, crs=crs)
+    pyogrio.write_dataframe(gdf, str(out_path), driver=driver)
+
+    print(f"{driver} exported: {out_path}", flush=True)  # workers may exit without flushing stdout
     return out_path
 
 
@@ -366,6 +497,12 @@ def main():
         "--ids-file",
         help="Path to a file containing SA1 IDs (one per line).",
     )
+    parser.add_argument(
+        "--format",
+        default="geojson",
+        choices=sorted(OUTPUT_FORMATS),
+        help="Output format: geojson (default), geojsonseq (GeoJSON Text Sequences) or fgb (FlatGeobuf).",
+    )
     args = parser.parse_args()
 
     # Default to SA1 run when using CLI
@@ -404,52 +541,19 @@ def main():
     crs, target_geoms = load_target_features(shp_path, key_field=None, target_ids=target_ids, scale='sa1')
     if not target_geoms:
         raise ValueError("No target SA1 geometries found in shapefile for the provided IDs.")
-
-    out_files = []
-    for d in to_run:
-        csv_path = (base / DATASETS[d]).expanduser()
-        out_path = (base / f"selected_sa1_{d}.geojson").expanduser()
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-
-        # Load CSV for this dataset
-        with open(csv_path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-        if not rows:
-            raise ValueError(f"No rows read from CSV: {csv_path}")
-
-        # Detect SA1 field and build lookup
-        sa1_field = detect_id_field(rows[0], scale='sa1')
-        if not sa1_field:
-            raise KeyError(
-                f"Could not detect SA1 column in {csv_path}. Expected one of 'SA1 (UR)', 'SA1_CODE21', etc."
-            )
-        for r in rows:
-            r["SA1_CODE21"] = norm_sa1(r.get(sa1_field, ""))
-        by_sa1 = {r["SA1_CODE21"]: {k: r[k] for k in r if k != "SA1_CODE21"} for r in rows}
-
-        # Build schema (allow mixed Polygon/MultiPolygon)
-        prop_keys = [k for k in rows[0].keys() if k != "SA1_CODE21"]
-        out_schema = {"geometry": "Unknown", "properties": {"SA1_CODE": "str"}}
-        for k in prop_keys:
-            out_schema["properties"][k] = "str"
-
-        # Write GeoJSON using cached geometries
-        with fiona.open(str(out_path), "w", driver="GeoJSON", crs=crs, schema=out_schema) as dst:
-            for sa1 in target_ids:
-                geom = target_geoms.get(sa1)
-                if not geom:
-                    continue
-                attrs = by_sa1.get(sa1, {})
-                props = {k: "" for k in out_schema["properties"].keys()}
-                props["SA1_CODE"] = sa1
-                for k in prop_keys:
-                    if k in attrs:
-                        props[k] = str(attrs[k])
-                dst.write({"type": "Feature", "geometry": geom, "properties": props})
-
-        print(f"GeoJSON exported: {out_path}")
-        out_files.append(out_path)
+    # Features written for every dataset: the matched target SA1s with a non-empty geometry
+    codes = [sa1 for sa1, geom in target_geoms.items() if sa1 in target_ids and geom is not None and not geom.is_empty]
+    geoms = [target_geoms[sa1] for sa1 in codes]
+
+    # Datasets are independent (own CSV, own output file), so run them in worker processes
+    workers = min(len(to_run), os.cpu_count() or 1)
+    jobs = [(d, base, target_ids, codes, geoms, crs) for d in to_run]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futures = [ex.submit(process_one_dataset, *job, out_format=args.format) for job in jobs]
+            out_files = [f.result() for f in futures]
+    else:
+        out_files = [process_one_dataset(*job, out_format=args.format) for job in jobs]
 
     print("Done. Outputs:\n - " + "\n - ".join(map(str, out_files)))
 
@@ -2,6 +2,15 @@ import json
 import re
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
+try:
+    import json5  # parses JS/ES5 object literals directly (pip install json5)
+except ImportError:
+    json5 = None
+
+# Patterns used by load_and_parse_js_object, compiled once at import
+_OBJECT_RE = re.compile(r'=\s*(\{.*?\});', re.DOTALL)
+_SINGLE_QUOTED_RE = re.compile(r"'([^']*)'")
+_BARE_KEY_RE = re.compile(r'(\s*?{\s*?|\s*?,\s*?)([^"\s]+?)\s*?:')
 
 def load_and_parse_js_object(filepath):
     """
@@ -13,12 +22,16 @@ def load_and_parse_js_object(filepath):
 
         # Use regex to find the object literal within the file
         # This looks for content between the first '{' and the last '};'
-        match = re.search(r'=\s*(\{.*?\});', js_content, re.DOTALL)
+        match = _OBJECT_RE.search(js_content)
         if not match:
             raise ValueError("Could not find a JavaScript object literal in the file.")
         
         object_str = match.group(1)
-        
+        if json5 is not None:
+            # A real ES5 parser handles single quotes, bare keys and apostrophes in values
+            return json5.loads(object_str)
+
+        # Without json5, fall back to rewriting the literal as JSON.
         # The JS object uses single quotes, which is not valid JSON.
         # We need to be careful with replacements. A simple replace might break strings
         # containing apostrophes. A safer way is to use a more robust parser if the
@@ -26,9 +39,9 @@ def load_and_parse_js_object(filepath):
         
         # Step 1: Replace single quotes used for keys and values with double quotes
         # This regex specifically targets keys and string values
-        json_str = re.sub(r"'([^']*)'", r'"\1"', object_str)
+        json_str = _SINGLE_QUOTED_RE.sub(r'"\1"', object_str)
         # Step 2: Ensure keys that might not have been quoted are quoted
-        json_str = re.sub(r'(\s*?{\s*?|\s*?,\s*?)([^"\s]+?)\s*?:', r'\1"\2":', json_str)
+        json_str = _BARE_KEY_RE.sub(r'\1"\2":', json_str)
 
 
         # Parse the cleaned string as JSON
@@ -1,9 +1,10 @@
+import hashlib
 import json
+import os
 import re
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
 # --- Initialize Flask App and CORS ---
@@ -34,21 +35,60 @@ def create_documents_from_metadata(metadata):
     return indicator_names, documents
 
 # --- MODIFIED function to return a ranked list ---
-def find_ranked_indicators(query, model, indicator_names, document_embeddings):
+def find_ranked_indicators(query, model, indicator_names, document_embeddings, top_k=None):
     """
     Finds and ranks all indicators based on relevance to a user query.
+    Document embeddings are L2-normalised at load time, so cosine similarity
+    reduces to a dot product with the normalised query.
+    If top_k is given, only the top_k best matches are returned.
     """
-    query_embedding = model.encode([query])
-    similarities = cosine_similarity(query_embedding, document_embeddings)[0]
-
-    # Combine indicators with their scores
-    results = []
-    for i, name in enumerate(indicator_names):
-        results.append({"indicator": name, "score": float(similarities[i])})
+    query_embedding = model.encode([query], normalize_embeddings=True, convert_to_numpy=True)[0].astype(np.float32)
+    similarities = document_embeddings @ query_embedding
+
+    # Sort by score in descending order, then build result dicts in ranked order
+    if top_k is not None and 0 < top_k < len(similarities):
+        # Partition out the top_k scores in O(N) and only sort those
+        order = np.argpartition(-similarities, top_k - 1)[:top_k]
+        order = order[np.argsort(-similarities[order], kind="stable")]
+    else:
+        order = np.argsort(-similarities, kind="stable")
+    return [{"indicator": indicator_names[i], "score": float(similarities[i])} for i in order]
+
+def load_document_embeddings(model, documents, metadata_path, model_name):
+    """
+    Loads L2-normalised float32 document embeddings from a .npy cache next to
+    the metadata file, keyed by the model name and a hash of the file contents,
+    or encodes the documents and writes it.
+    """
+    with open(metadata_path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    cache_path = os.path.join(os.path.dirname(metadata_path), f'.embed_cache_{model_name}_{digest}.npy')
+    if os.path.exists(cache_path):
+        embeddings = np.load(cache_path)
+        if embeddings.shape[0] == len(documents):
+            return embeddings
+    # Both encoders sort documents by length before batching, so batches pad to similar lengths
+    embeddings = model.encode(documents, batch_size=64, show_progress_bar=False, convert_to_numpy=True,
+                              normalize_embeddings=True).astype(np.float32)
+    try:
+        np.save(cache_path, embeddings)
+    except OSError as e:
+        print(f"Could not write embeddings cache: {e}")
+    return embeddings
 
-    # Sort by score in descending order
-    ranked_results = sorted(results, key=lambda x: x['score'], reverse=True)
-    return ranked_results
+def load_sentence_model():
+    """
+    Prefers the int8 ONNX Runtime export of the model (see onnx_encoder.py)
+    and falls back to the PyTorch SentenceTransformer if it is not available.
+    Returns the model and a name used to key the embeddings cache.
+    """
+    try:
+        from onnx_encoder import OnnxSentenceEncoder, ONNX_MODEL_DIR, ONNX_MODEL_FILE
+        if os.path.exists(os.path.join(ONNX_MODEL_DIR, ONNX_MODEL_FILE)):
+            return OnnxSentenceEncoder(ONNX_MODEL_DIR), 'all-MiniLM-L6-v2-int8'
+    except ImportError as e:
+        print(f"ONNX Runtime encoder unavailable ({e}), using PyTorch model.")
+    return SentenceTransformer('all-MiniLM-L6-v2'), 'all-MiniLM-L6-v2'
 
 # --- Pre-load model and data ONCE on server startup for efficiency ---
 print("Backend server is starting...")
@@ -58,9 +98,9 @@ METADATA = load_metadata_from_json(JSON_FILEPATH)
 if METADATA:
     INDICATOR_NAMES, DOCUMENTS = create_documents_from_metadata(METADATA)
     print("Loading sentence transformer model (this may take a moment)...")
-    MODEL = SentenceTransformer('all-MiniLM-L6-v2')
-    print("Creating embeddings for the knowledge base...")
-    DOCUMENT_EMBEDDINGS = MODEL.encode(DOCUMENTS)
+    MODEL, MODEL_NAME = load_sentence_model()
+    print("Loading embeddings for the knowledge base...")
+    DOCUMENT_EMBEDDINGS = load_document_embeddings(MODEL, DOCUMENTS, JSON_FILEPATH, MODEL_NAME)
     print("✅ Backend ready.")
 else:
     print("❌ ERROR: Could not load metadata. Backend cannot process requests.")
@@ -78,9 +118,12 @@ def search_indicators():
         return jsonify({"error": "Missing 'query' in request body"}), 400
 
     user_query = data['query']
+    top_k = data.get('topK')
+    if top_k is not None and (isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1):
+        return jsonify({"error": "'topK' must be a positive integer"}), 400
 
-    # Get the ranked list of indicators
-    ranked_indicators = find_ranked_indicators(user_query, MODEL, INDICATOR_NAMES, DOCUMENT_EMBEDDINGS)
+    # Get the ranked list of indicators (all of them unless topK is given)
+    ranked_indicators = find_ranked_indicators(user_query, MODEL, INDICATOR_NAMES, DOCUMENT_EMBEDDINGS, top_k)
 
     return jsonify(ranked_indicators)
 
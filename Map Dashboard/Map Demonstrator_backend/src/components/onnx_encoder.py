@@ -0,0 +1,65 @@
+import os
+import numpy as np
+import onnxruntime as ort
+from transformers import AutoTokenizer
+
+MODEL_ID = 'sentence-transformers/all-MiniLM-L6-v2'
+# Default export location, next to app_server.py
+ONNX_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'onnx_model')
+ONNX_MODEL_FILE = 'model.int8.onnx'
+
+
+class OnnxSentenceEncoder:
+    """
+    Drop-in replacement for SentenceTransformer.encode backed by an int8
+    quantised ONNX export of all-MiniLM-L6-v2 running on ONNX Runtime.
+    Embeddings are mean-pooled over the attention mask, as in SBERT.
+    """
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, max_length=256):
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = ort.InferenceSession(os.path.join(model_dir, ONNX_MODEL_FILE), providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.max_length = max_length
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=False, convert_to_numpy=True, **kwargs):
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        # Batch sentences of similar length together (longest first, as SBERT does)
+        # so each batch pads to a similar length; rows are restored to input order below
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        sorted_sentences = [sentences[i] for i in order]
+        batches = []
+        for start in range(0, len(sorted_sentences), batch_size):
+            enc = self.tokenizer(sorted_sentences[start:start + batch_size], padding=True, truncation=True,
+                                 max_length=self.max_length, return_tensors="np")
+            feeds = {name: enc[name].astype(np.int64) for name in self.input_names if name in enc}
+            hidden = self.session.run(None, feeds)[0]  # (batch, tokens, dim)
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            batches.append((hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None))
+        embeddings = np.empty((len(sentences), batches[0].shape[1]) if batches else (0, 0), dtype=np.float32)
+        if batches:
+            embeddings[order] = np.concatenate(batches)
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+
+def export_quantized_model(out_dir=ONNX_MODEL_DIR):
+    """
+    One-time export: convert the model to ONNX with optimum, then apply
+    dynamic int8 weight quantisation with ONNX Runtime.
+    """
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    ORTModelForFeatureExtraction.from_pretrained(MODEL_ID, export=True).save_pretrained(out_dir)
+    AutoTokenizer.from_pretrained(MODEL_ID).save_pretrained(out_dir)
+    quantize_dynamic(os.path.join(out_dir, 'model.onnx'), os.path.join(out_dir, ONNX_MODEL_FILE),
+                     weight_type=QuantType.QInt8)
+    print(f"Quantised ONNX model written to {os.path.join(out_dir, ONNX_MODEL_FILE)}")
+
+
+if __name__ == "__main__":
+    # pip install "optimum[onnxruntime]"
+    export_quantized_model()